@@ -1,13 +1,9 @@
 import streamlit as st
 from PIL import Image
 import numpy as np
-from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import base64
-from pathlib import Path
 import io
+import re
+from collections import deque
 
 # Configure Streamlit page
 st.set_page_config(
@@ -162,136 +158,182 @@ h2, h3 {
 # Inject CSS
 st.markdown(STYLES, unsafe_allow_html=True)
 
+# Coarse color categories used for pixel classification
+COLOR_CATEGORIES = ('black', 'white', 'red', 'green', 'blue', 'gray', 'yellow', 'brown')
+
+# Color proportions barely change with resolution, so analysis runs on a thumbnail
+ANALYSIS_SIZE = (128, 128)
+
+# Nutrient keys holding plain numeric values; the first five feed the radar chart
+NUMERIC_NUTRIENT_KEYS = ('protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+RADAR_NUTRIENT_KEYS = NUMERIC_NUTRIENT_KEYS[:5]
+RADAR_NUTRIENT_LABELS = tuple(key.capitalize() for key in RADAR_NUTRIENT_KEYS)
+
+def keyword_pattern(*keywords):
+    """Compile keywords into one case-insensitive substring matcher"""
+    return re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+
+# Chat intent matchers, checked in order
+GREETING_PATTERN = keyword_pattern('hi', 'hello', 'hey')
+CALORIE_PATTERN = keyword_pattern('calorie', 'calories', 'cal')
+NUTRITION_PATTERN = keyword_pattern('nutrient', 'nutrition', 'protein', 'carb', 'fat')
+MICRONUTRIENT_PATTERN = keyword_pattern('vitamin', 'mineral')
+HEALTH_PATTERN = keyword_pattern('health', 'healthy', 'score')
+COOKING_PATTERN = keyword_pattern('cook', 'prepare', 'make')
+SUSTAINABILITY_PATTERN = keyword_pattern('sustainable', 'environment', 'eco')
+ALLERGEN_PATTERN = keyword_pattern('allergy', 'allergen')
+
+# Chat messages kept per session; older ones are dropped
+MAX_CHAT_MESSAGES = 50
+
+# Reference nutrition profiles keyed by dominant color
+FOOD_DATABASE = {
+    'red_dominant': {
+        'name': 'Tomato-based/Red Meat Dish',
+        'calories': 250,
+        'nutrients': {
+            'protein': 8.0,
+            'carbs': 30.0,
+            'fat': 12.0,
+            'fiber': 4.0,
+            'sugar': 6.0,
+            'sodium': 500.0,
+            'vitamins': {
+                'A': 25,
+                'C': 35,
+                'B12': 40,
+                'D': 15,
+                'E': 20
+            },
+            'minerals': {
+                'Iron': 15,
+                'Zinc': 20,
+                'Magnesium': 10
+            }
+        },
+        'allergens': ['none'],
+        'healthScore': 75,
+        'sustainability_score': 65,
+        'preparation_time': '30-45 mins',
+        'cooking_method': ['Grilling', 'Baking', 'Pan-frying'],
+        'dietary_tags': ['High-protein', 'Gluten-free']
+    },
+    'green_dominant': {
+        'name': 'Vegetable/Salad Dish',
+        'calories': 150,
+        'nutrients': {
+            'protein': 5.0,
+            'carbs': 20.0,
+            'fat': 8.0,
+            'fiber': 6.0,
+            'sugar': 4.0,
+            'sodium': 300.0,
+            'vitamins': {
+                'A': 40,
+                'C': 60,
+                'K': 45,
+                'E': 30,
+                'B6': 25
+            },
+            'minerals': {
+                'Iron': 10,
+                'Calcium': 15,
+                'Potassium': 20
+            }
+        },
+        'allergens': ['none'],
+        'healthScore': 90,
+        'sustainability_score': 95,
+        'preparation_time': '15-20 mins',
+        'cooking_method': ['Raw', 'Steaming', 'Light sautéing'],
+        'dietary_tags': ['Vegan', 'Low-calorie', 'High-fiber']
+    }
+}
+
+# Chat response templates
+CHAT_TEMPLATES = {
+    'greeting': [
+        "Hello! I'd be happy to tell you about this food.",
+        "Hi there! What would you like to know about this dish?",
+        "Welcome! Ask me anything about this food!"
+    ],
+    'nutrition': [
+        "This {name} contains {calories} calories with {protein} protein, {carbs} carbs, and {fat} fat.",
+        "The nutritional breakdown shows {calories} calories, with {protein} protein, {carbs} carbs, and {fat} fat.",
+        "You're looking at {calories} calories per serving, including {protein} protein, {carbs} carbs, and {fat} fat."
+    ],
+    'health': [
+        "This food has a health score of {score}/100, making it a {rating} choice.",
+        "With a health score of {score}/100, this is considered a {rating} option.",
+        "The health rating is {score}/100, which indicates it's a {rating} food choice."
+    ]
+}
+
 class AdvancedFoodAnalyzer:
     def __init__(self):
         # Food database
-        self.food_database = {
-            'red_dominant': {
-                'name': 'Tomato-based/Red Meat Dish',
-                'calories': 250,
-                'nutrients': {
-                    'protein': 8.0,
-                    'carbs': 30.0,
-                    'fat': 12.0,
-                    'fiber': 4.0,
-                    'sugar': 6.0,
-                    'sodium': 500.0,
-                    'vitamins': {
-                        'A': 25,
-                        'C': 35,
-                        'B12': 40,
-                        'D': 15,
-                        'E': 20
-                    },
-                    'minerals': {
-                        'Iron': 15,
-                        'Zinc': 20,
-                        'Magnesium': 10
-                    }
-                },
-                'allergens': ['none'],
-                'healthScore': 75,
-                'sustainability_score': 65,
-                'preparation_time': '30-45 mins',
-                'cooking_method': ['Grilling', 'Baking', 'Pan-frying'],
-                'dietary_tags': ['High-protein', 'Gluten-free']
-            },
-            'green_dominant': {
-                'name': 'Vegetable/Salad Dish',
-                'calories': 150,
-                'nutrients': {
-                    'protein': 5.0,
-                    'carbs': 20.0,
-                    'fat': 8.0,
-                    'fiber': 6.0,
-                    'sugar': 4.0,
-                    'sodium': 300.0,
-                    'vitamins': {
-                        'A': 40,
-                        'C': 60,
-                        'K': 45,
-                        'E': 30,
-                        'B6': 25
-                    },
-                    'minerals': {
-                        'Iron': 10,
-                        'Calcium': 15,
-                        'Potassium': 20
-                    }
-                },
-                'allergens': ['none'],
-                'healthScore': 90,
-                'sustainability_score': 95,
-                'preparation_time': '15-20 mins',
-                'cooking_method': ['Raw', 'Steaming', 'Light sautéing'],
-                'dietary_tags': ['Vegan', 'Low-calorie', 'High-fiber']
-            }
-        }
+        self.food_database = FOOD_DATABASE
 
         # Chat response templates
-        self.chat_templates = {
-            'greeting': [
-                "Hello! I'd be happy to tell you about this food.",
-                "Hi there! What would you like to know about this dish?",
-                "Welcome! Ask me anything about this food!"
-            ],
-            'nutrition': [
-                "This {name} contains {calories} calories with {protein} protein, {carbs} carbs, and {fat} fat.",
-                "The nutritional breakdown shows {calories} calories, with {protein} protein, {carbs} carbs, and {fat} fat.",
-                "You're looking at {calories} calories per serving, including {protein} protein, {carbs} carbs, and {fat} fat."
-            ],
-            'health': [
-                "This food has a health score of {score}/100, making it a {rating} choice.",
-                "With a health score of {score}/100, this is considered a {rating} option.",
-                "The health rating is {score}/100, which indicates it's a {rating} food choice."
-            ]
-        }
+        self.chat_templates = CHAT_TEMPLATES
+
+        # Color lookup table over 4-bit quantized (r, g, b), built once and
+        # flattened so it can be indexed by a packed 12-bit rgb value
+        self._color_lut = self._build_color_lut().ravel()
+
+        # Nutrient radar figures keyed by their plotted values
+        self._nutrient_charts = {}
+
+    @staticmethod
+    def _build_color_lut():
+        """Classify every 4-bit quantized RGB value into a color category index"""
+        levels = np.arange(16, dtype=np.int16) * 17
+        r, g, b = np.meshgrid(levels, levels, levels, indexing='ij')
+        
+        # Rules are checked in order; the first match wins
+        rules = [
+            (np.maximum(np.maximum(r, g), b) < 30, 'black'),
+            (np.minimum(np.minimum(r, g), b) > 225, 'white'),
+            (r > np.maximum(g, b) + 20, 'red'),
+            (g > np.maximum(r, b) + 20, 'green'),
+            (b > np.maximum(r, g) + 20, 'blue'),
+            ((np.abs(r - g) < 20) & (np.abs(g - b) < 20) & (np.abs(r - b) < 20), 'gray'),
+            ((r > 150) & (g > 150), 'yellow'),
+        ]
+        lut = np.select(
+            [condition for condition, _ in rules],
+            [COLOR_CATEGORIES.index(color) for _, color in rules],
+            default=COLOR_CATEGORIES.index('brown')
+        )
+        return lut.astype(np.uint8)
 
     def analyze_image(self, image):
         """Analyze food image and return nutritional information"""
         try:
-            img_array = np.array(image)
-            
-            # Handle different image formats
-            if len(img_array.shape) == 3 and img_array.shape[-1] == 4:
-                img_array = img_array[:,:,:3]
-            elif len(img_array.shape) == 2:
-                img_array = np.stack((img_array,) * 3, axis=-1)
+            # Let Pillow normalize alpha/grayscale/palette input to (H, W, 3) uint8
+            # and downsample; the caller's image is left untouched for display
+            small = image.convert('RGB')
+            small.thumbnail(ANALYSIS_SIZE, Image.Resampling.BILINEAR)
+            img_array = np.asarray(small)
                 
-            pixels = img_array.reshape(-1, 3)
-            
-            def categorize_color(pixel):
-                r, g, b = pixel
-                if max(r, g, b) < 30:
-                    return 'black'
-                elif min(r, g, b) > 225:
-                    return 'white'
-                elif r > max(g, b) + 20:
-                    return 'red'
-                elif g > max(r, b) + 20:
-                    return 'green'
-                elif b > max(r, g) + 20:
-                    return 'blue'
-                elif abs(r - g) < 20 and abs(g - b) < 20 and abs(r - b) < 20:
-                    return 'gray'
-                elif r > 150 and g > 150:
-                    return 'yellow'
-                else:
-                    return 'brown'
-                    
-            color_counts = {}
-            total_pixels = len(pixels)
+            # Quantize each channel to 4 bits and pack them into one uint16 index,
+            # so a single narrow index array feeds the table lookup
+            index = np.left_shift(img_array[..., 0] >> 4, 8, dtype=np.uint16)
+            index |= np.left_shift(img_array[..., 1] >> 4, 4, dtype=np.uint16)
+            index |= img_array[..., 2] >> 4
+            labels = self._color_lut.take(index)
             
-            for pixel in pixels:
-                color = categorize_color(pixel)
-                color_counts[color] = color_counts.get(color, 0) + 1
+            # Single-pass histogram over the category labels
+            counts = np.bincount(labels.ravel(), minlength=len(COLOR_CATEGORIES))
+            percentages = counts * (100.0 / labels.size)
                 
-            color_distribution = {
-                color: f"{(count/total_pixels * 100):.1f}%"
-                for color, count in color_counts.items()
+            # Raw percentages; format them only where they are displayed
+            color_distribution_raw = {
+                color: float(percentage)
+                for color, percentage in zip(COLOR_CATEGORIES, percentages) if percentage
             }
             
-            dominant_color = max(color_counts.items(), key=lambda x: x[1])[0]
+            dominant_color = COLOR_CATEGORIES[int(counts.argmax())]
             food_info = self.food_database.get(f'{dominant_color}_dominant', 
                                              self.food_database['red_dominant'])
             
@@ -304,7 +346,7 @@ class AdvancedFoodAnalyzer:
                 'sustainability_score': food_info['sustainability_score'],
                 'preparation_time': food_info['preparation_time'],
                 'cooking_method': food_info['cooking_method'],
-                'color_distribution': color_distribution,
+                'color_distribution_raw': color_distribution_raw,
                 'dietary_tags': food_info.get('dietary_tags', [])
             }
             
@@ -314,39 +356,37 @@ class AdvancedFoodAnalyzer:
 
     def generate_chat_response(self, query, food_info):
         """Generate contextual responses to user queries about the food"""
-        query = query.lower()
-        
         # Basic intent recognition
-        if any(word in query for word in ['hi', 'hello', 'hey']):
+        if GREETING_PATTERN.search(query):
             return np.random.choice(self.chat_templates['greeting'])
             
-        elif any(word in query for word in ['calorie', 'calories', 'cal']):
+        elif CALORIE_PATTERN.search(query):
             return f"This {food_info['name']} contains {food_info['calories']} calories."
             
-        elif any(word in query for word in ['nutrient', 'nutrition', 'protein', 'carb', 'fat']):
+        elif NUTRITION_PATTERN.search(query):
             nutrients = food_info['nutrients']
             return f"Here's the nutritional breakdown:\n- Protein: {nutrients['protein']}g\n- Carbs: {nutrients['carbs']}g\n- Fat: {nutrients['fat']}g\n- Fiber: {nutrients['fiber']}g"
             
-        elif any(word in query for word in ['vitamin', 'mineral']):
+        elif MICRONUTRIENT_PATTERN.search(query):
             vitamins = food_info['nutrients']['vitamins']
             minerals = food_info['nutrients']['minerals']
             return f"Vitamins: {', '.join(f'{k}: {v}%' for k, v in vitamins.items())}\nMinerals: {', '.join(f'{k}: {v}%' for k, v in minerals.items())}"
             
-        elif any(word in query for word in ['health', 'healthy', 'score']):
+        elif HEALTH_PATTERN.search(query):
             score = food_info['healthScore']
             rating = "excellent" if score >= 80 else "good" if score >= 60 else "moderate"
             return f"This food has a health score of {score}/100, making it a {rating} choice for your health."
             
-        elif any(word in query for word in ['cook', 'prepare', 'make']):
+        elif COOKING_PATTERN.search(query):
             methods = ", ".join(food_info['cooking_method'])
             return f"You can prepare this dish using these methods: {methods}. It typically takes {food_info['preparation_time']} to prepare."
             
-        elif any(word in query for word in ['sustainable', 'environment', 'eco']):
+        elif SUSTAINABILITY_PATTERN.search(query):
             score = food_info['sustainability_score']
             impact = "very environmentally friendly" if score >= 80 else "moderately sustainable" if score >= 60 else "has room for improvement"
             return f"This food has a sustainability score of {score}/100, meaning it's {impact}."
             
-        elif any(word in query for word in ['allergy', 'allergen']):
+        elif ALLERGEN_PATTERN.search(query):
             allergens = ", ".join(food_info['allergens']) if food_info['allergens'] else "no common allergens"
             return f"Regarding allergens: {allergens}."
             
@@ -355,13 +395,17 @@ class AdvancedFoodAnalyzer:
 
     def create_nutrient_chart(self, nutrients):
         """Create a radar chart for nutrient visualization"""
-        categories = ['Protein', 'Carbs', 'Fat', 'Fiber', 'Sugar']
-        values = [nutrients[cat.lower()] for cat in categories]
+        values = tuple(nutrients[key] for key in RADAR_NUTRIENT_KEYS)
+        if values in self._nutrient_charts:
+            return self._nutrient_charts[values]
+        
+        # Imported lazily so cold starts without an image skip plotly
+        import plotly.graph_objects as go
         
         fig = go.Figure()
         fig.add_trace(go.Scatterpolar(
             r=values,
-            theta=categories,
+            theta=RADAR_NUTRIENT_LABELS,
             fill='toself',
             name='Nutrients'
         ))
@@ -377,19 +421,33 @@ class AdvancedFoodAnalyzer:
             margin=dict(t=30, b=30)
         )
         
+        self._nutrient_charts[values] = fig
         return fig
 
 # [Previous imports and styles remain the same until the main() function]
 
+@st.cache_resource
+def get_analyzer():
+    """Build the analyzer once and share it across reruns and sessions"""
+    return AdvancedFoodAnalyzer()
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def analyze_image_bytes(image_bytes):
+    """Analyze an encoded image, memoized on its raw bytes"""
+    image = Image.open(io.BytesIO(image_bytes))
+    # Let libjpeg decode at a reduced DCT scale; a no-op for other formats
+    image.draft('RGB', ANALYSIS_SIZE)
+    return get_analyzer().analyze_image(image)
+
 def main():
     st.title("🍽 AI Food Analyzer Pro")
     st.markdown("### Intelligent Food Analysis & Nutrition Insights with Chat")
     
-    analyzer = AdvancedFoodAnalyzer()
+    analyzer = get_analyzer()
     
     # Initialize session state for chat
     if 'chat_messages' not in st.session_state:
-        st.session_state.chat_messages = []
+        st.session_state.chat_messages = deque(maxlen=MAX_CHAT_MESSAGES)
     
     if 'current_food_info' not in st.session_state:
         st.session_state.current_food_info = None
@@ -410,35 +468,37 @@ def main():
             image_input = st.file_uploader("Choose a food image...", type=['png', 'jpg', 'jpeg'])
         
         if image_input:
-            image = Image.open(image_input)
-            st.image(image, caption="Input Image", use_column_width=True)
+            # Read the upload once; the same bytes feed display and analysis
+            image_bytes = image_input.getvalue()
+            st.image(image_bytes, caption="Input Image", use_column_width=True)
     
     with col2:
         if image_input:
+            # Reruns with the same image are served from the cache
             with st.spinner('Analyzing food with AI...'):
-                results = analyzer.analyze_image(image)
-                st.session_state.current_food_info = results
+                results = analyze_image_bytes(image_bytes)
+            st.session_state.current_food_info = results
+            
+            if "error" in results:
+                st.error(results["error"])
+            else:
+                st.markdown("### 📊 Analysis Results")
                 
-                if "error" in results:
-                    st.error(results["error"])
-                else:
-                    st.markdown("### 📊 Analysis Results")
-                    
-                    # Display food name and health score
-                    st.markdown(f"**Detected Food:** {results['name']}")
-                    health_score = results['healthScore']
-                    score_color = (
-                        "health-score-high" if health_score >= 80
-                        else "health-score-medium" if health_score >= 60
-                        else "health-score-low"
-                    )
-                    st.markdown(f"**Health Score:** <span class='{score_color}'>{health_score}/100</span>", 
-                              unsafe_allow_html=True)
-                    
-                    # Display nutrient chart
-                    st.markdown("#### Nutrient Distribution")
-                    fig = analyzer.create_nutrient_chart(results['nutrients'])
-                    st.plotly_chart(fig, use_container_width=True)
+                # Display food name and health score in a single element
+                health_score = results['healthScore']
+                score_color = (
+                    "health-score-high" if health_score >= 80
+                    else "health-score-medium" if health_score >= 60
+                    else "health-score-low"
+                )
+                st.markdown(f"**Detected Food:** {results['name']}  \n"
+                          f"**Health Score:** <span class='{score_color}'>{health_score}/100</span>", 
+                          unsafe_allow_html=True)
+                
+                # Display nutrient chart
+                st.markdown("#### Nutrient Distribution")
+                fig = analyzer.create_nutrient_chart(results['nutrients'])
+                st.plotly_chart(fig, use_container_width=True)
     
     with col3:
         st.markdown("### 💬 Chat with AI")
@@ -446,11 +506,12 @@ def main():
         # Display chat messages
         chat_container = st.container()
         with chat_container:
-            for message in st.session_state.chat_messages:
-                if message["role"] == "user":
-                    st.markdown(f"**You:** {message['content']}")
-                else:
-                    st.markdown(f"**AI:** {message['content']}")
+            if st.session_state.chat_messages:
+                # One element for the whole conversation instead of one per message
+                st.markdown("\n\n".join(
+                    f"**{'You' if message['role'] == 'user' else 'AI'}:** {message['content']}"
+                    for message in st.session_state.chat_messages
+                ))
         
         # Chat input
         if st.session_state.current_food_info:
@@ -476,7 +537,7 @@ def main():
         
         # Clear chat button
         if st.button("Clear Chat"):
-            st.session_state.chat_messages = []
+            st.session_state.chat_messages.clear()
 
 if __name__ == "__main__":
     main()